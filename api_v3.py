@@ -4,79 +4,285 @@ import time
 import spacy
 import pdfplumber
 import docx
-import pytesseract
 import asyncio
 import json
-from concurrent.futures import ProcessPoolExecutor
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
-from pdf2image import convert_from_bytes
-from PIL import Image
+import re
+import random
+import hashlib
+import marshal
+import cProfile
+import pstats
+import functools
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import StreamingResponse, FileResponse, Response
+from spacy.attrs import LOWER
 from typing import List
+from result_formats import StreamEncoder, negotiate, encode_batch, STREAM_FORMATS, BATCH_FORMATS, JSON
+from dedup import simhash, content_hash, group_exact_duplicates, NearDuplicateIndex
+from jobs import JobStore, JobRunner
+from distributed import DistributedExecutor
+from pool_sizing import AdaptiveProcessPool, effective_cpu_count
+from sessions import SessionStore
+from ocr import ocr_image_bytes, ocr_pdf_bytes
+from skill_index import INDEX_ID_PATTERN, write_index, load_index, list_index_ids, parse_query, run_query
 
 app = FastAPI(title="Safe Real-Time Resume Parser")
 
 # --- 1. WORKER LIMIT ---
-half_cpu = max(1, os.cpu_count() // 2)
-executor = ProcessPoolExecutor(max_workers=half_cpu)
+# The local pool is sized from the container's CPU quota and OMP_THREAD_LIMIT,
+# then grows/shrinks with queue depth (POOL_MIN_WORKERS / POOL_MAX_WORKERS).
+# With WORKER_NODES="host:port,unix:/path,..." this node only coordinates and
+# the resumes are processed by `python distributed.py` worker nodes instead.
+WORKER_NODES = [a.strip() for a in os.environ.get("WORKER_NODES", "").split(",") if a.strip()]
+if WORKER_NODES:
+    executor = DistributedExecutor(WORKER_NODES)
+else:
+    executor = AdaptiveProcessPool()
 
 # --- 2. GLOBAL LIMITS ---
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB per file
 MAX_RESUME_COUNT = 300           # Strict limit on total files per request
 
-def process_single_resume(file_bytes, filename, target_skills):
+# --- 3. PROFILING ---
+# Opt-in per request (profile=true) or by sampling a fraction of all files.
+# Only files slower than the threshold keep their profile on disk.
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_THRESHOLD_SEC = float(os.environ.get("PROFILE_THRESHOLD_SEC", "10"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]+-[0-9a-f]{16}$")
+
+# --- 4. ASYNC JOBS ---
+# Big intakes are spooled to a local SQLite queue and drained in the background,
+# sharing the same executor with at most JOB_CONCURRENCY files in flight.
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", effective_cpu_count() * 2))
+job_store = None
+job_runner = None
+
+# --- 5. RE-RANKING SESSIONS ---
+# keep_session=true keeps each resume's token set so skill tweaks can be
+# re-ranked without re-uploading (see sessions.py for TTL / size limits).
+session_store = SessionStore()
+
+# --- 6. TEXT-ONLY RANKING ---
+# /rank-texts skips extraction: records are tokenized and matched in batches.
+# In distributed mode text matching stays on this node's own process pool.
+TEXT_BATCH_SIZE = 500            # records per worker task
+TEXT_PIPE_BATCH_SIZE = 256       # nlp.pipe batch size inside a task
+MAX_TEXT_BATCHES_IN_FLIGHT = effective_cpu_count() * 2
+MAX_TEXT_RECORDS = 50_000        # records per request
+MAX_TEXT_LENGTH = 100_000        # characters per record
+MAX_TEXT_BODY_SIZE = 100 * 1024 * 1024  # 100MB request body
+text_executor = executor if isinstance(executor, AdaptiveProcessPool) else AdaptiveProcessPool()
+
+# --- 7. MICRO-BATCHING ---
+# Text PDFs and DOCX files are grouped so one worker task matches several of
+# them in a single nlp.pipe pass; images (OCR-bound) and profiled files run alone.
+BATCHABLE_EXTENSIONS = {"pdf", "docx"}
+FILE_BATCH_SIZE = 8
+FILE_PIPE_BATCH_SIZE = 32
+
+@functools.lru_cache(maxsize=32)
+def get_skill_matcher(target_skills):
+    """
+    Blank tokenizer + the LOWER ids of the skills, cached per worker process.
+    Skill patterns are single LOWER tokens, so looking token ids up directly
+    finds exactly what an EntityRuler would, without running the ruler.
+    """
+    nlp = spacy.blank("en")
+    skill_ids = {nlp.vocab.strings.add(s): s for s in target_skills}
+    return nlp, skill_ids
+
+def matched_skills(doc, skill_ids):
+    return sorted({skill_ids[i] for i in doc.to_array(LOWER).tolist() if i in skill_ids})
+
+def match_text_batch(records, target_skills):
+    """Scores a batch of {id, text} records with a single tokenizer.pipe pass."""
+    nlp, skill_ids = get_skill_matcher(tuple(target_skills))
+    results = []
+    texts = (r["text"] for r in records)
+    for record, doc in zip(records, nlp.tokenizer.pipe(texts, batch_size=TEXT_PIPE_BATCH_SIZE)):
+        found_matches = matched_skills(doc, skill_ids)
+        results.append({
+            "status": "success",
+            "id": record["id"],
+            "score": len(found_matches),
+            "matched_skills": found_matches
+        })
+    return results
+
+def extract_text(file_bytes, filename):
     ext = filename.lower().split('.')[-1]
     text = ""
+    if ext == "pdf":
+        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+            text = "\n".join([p.extract_text() for p in pdf.pages if p.extract_text()])
+        if len(text.strip()) < 50:
+            text = ocr_pdf_bytes(file_bytes)
+    elif ext == "docx":
+        doc = docx.Document(io.BytesIO(file_bytes))
+        text = "\n".join([p.text for p in doc.paragraphs])
+    elif ext in ["jpg", "jpeg", "png"]:
+        text = ocr_image_bytes(file_bytes)
+    return text
+
+def build_result(filename, text, doc, skill_ids, elapsed, keep_tokens, fingerprint):
+    found_matches = matched_skills(doc, skill_ids)
+    return {
+        "status": "success",
+        "filename": filename,
+        "score": len(found_matches),
+        "matched_skills": found_matches,
+        "time_taken_sec": round(elapsed, 3),
+        # SimHash only when the request dedups; it costs more than the matching itself
+        **({"text_fingerprint": simhash(text)} if fingerprint else {}),
+        **({"tokens": sorted({t.lower_ for t in doc})} if keep_tokens else {})
+    }
+
+def micro_batches(items):
+    """Splits [(file_bytes, filename, key, sampled), ...] into worker tasks."""
+    if WORKER_NODES:
+        # The worker node protocol carries one file per task
+        return [[item] for item in items]
+    singles, batchable = [], []
+    for item in items:
+        ext = item[1].lower().split('.')[-1]
+        if ext in BATCHABLE_EXTENSIONS and not item[3]:
+            batchable.append(item)
+        else:
+            singles.append([item])
+    # Small requests keep one file per task so every worker still gets work
+    size = max(1, min(FILE_BATCH_SIZE, len(batchable) // (2 * effective_cpu_count())))
+    return singles + [batchable[i:i + size] for i in range(0, len(batchable), size)]
+
+def process_single_resume(file_bytes, filename, target_skills, keep_tokens=False, build_index=False, fingerprint=False):
     start_time = time.time()
 
     try:
-        if ext == "pdf":
-            with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-                text = "\n".join([p.extract_text() for p in pdf.pages if p.extract_text()])
-            if len(text.strip()) < 50:
-                pages = convert_from_bytes(file_bytes)
-                text = "\n".join([pytesseract.image_to_string(p) for p in pages])
-        elif ext == "docx":
-            doc = docx.Document(io.BytesIO(file_bytes))
-            text = "\n".join([p.text for p in doc.paragraphs])
-        elif ext in ["jpg", "jpeg", "png"]:
-            text = pytesseract.image_to_string(Image.open(io.BytesIO(file_bytes)))
-
-        nlp = spacy.blank("en")
-        ruler = nlp.add_pipe("entity_ruler")
-        patterns = [{"label": "SKILL", "pattern": [{"LOWER": s}]} for s in target_skills]
-        ruler.add_patterns(patterns)
-        
+        text = extract_text(file_bytes, filename)
+        nlp, skill_ids = get_skill_matcher(tuple(target_skills))
         doc = nlp(text)
-        found_matches = list(set([ent.text.lower() for ent in doc.ents if ent.label_ == "SKILL"]))
-        
-        return {
-            "status": "success",
-            "filename": filename,
-            "score": len(found_matches),
-            "matched_skills": sorted(found_matches),
-            "time_taken_sec": round(time.time() - start_time, 3)
-        }
+        result = build_result(filename, text, doc, skill_ids, time.time() - start_time, keep_tokens, fingerprint)
+        if build_index:
+            # INDEX_DIR comes from this worker's own environment, never from the caller
+            result["index_id"] = write_index(doc, content_hash(file_bytes), {"filename": filename})
+        return result
     except Exception as e:
         return {"status": "error", "filename": filename, "error": str(e)}
 
-@app.post("/rank-resumes")
-async def rank_resumes(
-    skills: str = Form(...), 
-    files: List[UploadFile] = File(...)
-):
-    # A. Check total file count before anything else
-    if len(files) > MAX_RESUME_COUNT:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Too many files! Maximum allowed is {MAX_RESUME_COUNT}, but you sent {len(files)}."
-        )
+def process_resume_batch(items, target_skills, keep_tokens=False, build_index=False, fingerprint=False):
+    """
+    Extracts a micro-batch of [(file_bytes, filename), ...] and matches all of
+    the texts in one nlp.pipe pass. Results are the same as running
+    process_single_resume on each file, including a failure only affecting
+    its own file; matching time is split evenly.
+    """
+    nlp, skill_ids = get_skill_matcher(tuple(target_skills))
+    results = [None] * len(items)
+    extracted = []  # (index, text, extraction seconds)
+    for i, (file_bytes, filename) in enumerate(items):
+        start_time = time.time()
+        try:
+            extracted.append((i, extract_text(file_bytes, filename), time.time() - start_time))
+        except Exception as e:
+            results[i] = {"status": "error", "filename": filename, "error": str(e)}
 
+    # n_process stays 1: this already runs inside a pool worker
+    match_start = time.time()
+    try:
+        docs = list(nlp.pipe((text for _, text, _ in extracted), batch_size=FILE_PIPE_BATCH_SIZE))
+    except Exception:
+        # Redo the batch one text at a time so only the file that broke fails
+        docs = []
+        for _, text, _ in extracted:
+            try:
+                docs.append(nlp(text))
+            except Exception as e:
+                docs.append(e)
+    match_share = (time.time() - match_start) / max(1, len(docs))
+
+    for (i, text, elapsed), doc in zip(extracted, docs):
+        file_bytes, filename = items[i]
+        try:
+            if isinstance(doc, Exception):
+                raise doc
+            result = build_result(filename, text, doc, skill_ids, elapsed + match_share, keep_tokens, fingerprint)
+            if build_index:
+                result["index_id"] = write_index(doc, content_hash(file_bytes), {"filename": filename})
+            results[i] = result
+        except Exception as e:
+            results[i] = {"status": "error", "filename": filename, "error": str(e)}
+    return results
+
+def profiled_process_single_resume(file_bytes, filename, target_skills, keep_tokens=False, build_index=False, fingerprint=False):
+    """
+    Runs process_single_resume under cProfile inside the worker.
+    Slow files come back with a "profile" entry (metadata + marshalled stats)
+    that the API process writes to its own PROFILE_DIR with save_profile,
+    so profiles taken on remote worker nodes land on the coordinator too.
+    """
+    profiler = cProfile.Profile()
+    start_time = time.time()
+    profiler.enable()
+    try:
+        result = process_single_resume(file_bytes, filename, target_skills, keep_tokens, build_index, fingerprint)
+    finally:
+        profiler.disable()
+    elapsed = time.time() - start_time
+
+    if elapsed >= PROFILE_THRESHOLD_SEC:
+        file_hash = hashlib.sha256(file_bytes).hexdigest()
+        profile_id = f"{int(start_time)}-{file_hash[:16]}"
+        profiler.create_stats()
+        metadata = {
+            "profile_id": profile_id,
+            "filename": filename,
+            "sha256": file_hash,
+            "size_bytes": len(file_bytes),
+            "target_skills": target_skills,
+            "elapsed_sec": round(elapsed, 3),
+            "status": result.get("status"),
+            "created_at": int(start_time),
+        }
+        # Same bytes profiler.dump_stats would write
+        result["profile"] = {"metadata": metadata, "stats": marshal.dumps(profiler.stats)}
+        result["profile_id"] = profile_id
+    return result
+
+def save_profile(profile):
+    metadata = profile["metadata"]
+    if not PROFILE_ID_PATTERN.match(metadata["profile_id"]):
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, metadata["profile_id"] + ".prof"), "wb") as f:
+        f.write(profile["stats"])
+    with open(os.path.join(PROFILE_DIR, metadata["profile_id"] + ".json"), "w") as f:
+        json.dump(metadata, f)
+
+def load_profile_metadata(profile_id):
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        raise HTTPException(status_code=400, detail="Invalid profile id")
+    path = os.path.join(PROFILE_DIR, profile_id + ".json")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    with open(path) as f:
+        return json.load(f)
+
+async def read_upload(file: UploadFile):
+    return await file.read(), file.filename
+
+def parse_skills(skills):
     target_skills = [s.strip().lower() for s in skills.split(",") if s.strip()]
     if not target_skills:
         raise HTTPException(status_code=400, detail="No skills provided")
+    return target_skills
 
-    # B. Check every file size (Individual Safety)
+def check_files(files):
+    if len(files) > MAX_RESUME_COUNT:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Too many files! Maximum allowed is {MAX_RESUME_COUNT}, but you sent {len(files)}."
+        )
+    # Individual Safety
     for file in files:
         if file.size > MAX_FILE_SIZE:
             raise HTTPException(
@@ -84,24 +290,456 @@ async def rank_resumes(
                 detail=f"File {file.filename} exceeds 5MB limit."
             )
 
+@app.post("/rank-resumes")
+async def rank_resumes(
+    request: Request,
+    skills: str = Form(...), 
+    files: List[UploadFile] = File(...),
+    profile: bool = Form(False),
+    dedup: bool = Form(True),
+    keep_session: bool = Form(False),
+    build_index: bool = Form(False)
+):
+    # A. Check file count and every file size before anything else
+    check_files(files)
+    target_skills = parse_skills(skills)
+    session = session_store.create(target_skills) if keep_session else None
+
+    # B. Pick the response encoding from the Accept header (NDJSON by default)
+    media_type = negotiate(request.headers.get("accept"), STREAM_FORMATS)
+    encoder = StreamEncoder(media_type, target_skills)
+
     async def stream_results():
-        async def read_file(file: UploadFile):
-            return await file.read(), file.filename
-        
-        file_data = await asyncio.gather(*[read_file(f) for f in files])
+        header = encoder.header()
+        if header is not None:
+            yield header
+
+        file_data = await asyncio.gather(*[read_upload(f) for f in files])
+
+        # Byte-identical uploads are processed once and fanned back out below
+        if dedup:
+            unique, copies = group_exact_duplicates(file_data)
+        else:
+            unique = [(content, name, i) for i, (content, name) in enumerate(file_data)]
+            copies = {i: [name] for _, name, i in unique}
 
         loop = asyncio.get_event_loop()
-        tasks = [
-            loop.run_in_executor(executor, process_single_resume, content, name, target_skills)
-            for content, name in file_data
-        ]
+
+        async def run(batch):
+            try:
+                if len(batch) == 1:
+                    content, name, key, sampled = batch[0]
+                    worker = profiled_process_single_resume if sampled else process_single_resume
+                    results = [await loop.run_in_executor(executor, worker, content, name, target_skills, keep_session, build_index, dedup)]
+                else:
+                    items = [(content, name) for content, name, _, _ in batch]
+                    results = await loop.run_in_executor(executor, process_resume_batch, items, target_skills, keep_session, build_index, dedup)
+            except Exception as e:
+                # e.g. every worker node failed this file; keep the rest of the stream going
+                results = [{"status": "error", "filename": name, "error": str(e)} for _, name, _, _ in batch]
+            for result in results:
+                if "profile" in result:
+                    await asyncio.to_thread(save_profile, result.pop("profile"))
+            return [(key, result) for (_, _, key, _), result in zip(batch, results)]
+
+        queued = [(content, name, key, profile or random.random() < PROFILE_SAMPLE_RATE) for content, name, key in unique]
+        tasks = [run(batch) for batch in micro_batches(queued)]
+        near_duplicates = NearDuplicateIndex()
 
         for task in asyncio.as_completed(tasks):
-            result = await task
-            yield json.dumps(result) + "\n"
+            for key, result in await task:
+                fingerprint = result.pop("text_fingerprint", None)
+                tokens = result.pop("tokens", None)
+                canonical = result["filename"]
+                if dedup:
+                    # Re-exported copies of the same CV still get their own score
+                    near = near_duplicates.match(fingerprint, result["filename"])
+                    if near is not None:
+                        result["duplicate_of"] = near
+                        canonical = near
+                yield encoder.encode(result)
+                if session:
+                    session.add(result, tokens)
+
+                for name in copies[key][1:]:
+                    copy = {**result, "filename": name, "duplicate_of": canonical}
+                    yield encoder.encode(copy)
+                    if session:
+                        session.add(copy, tokens)
+
+        if session:
+            session.complete = True
+
+    async def stream_into_session():
+        try:
+            async for chunk in stream_results():
+                yield chunk
+        finally:
+            if not session.complete:
+                # Client went away mid-stream; don't leave the session "processing" until the TTL
+                session.abort()
+
+    if session is None:
+        return StreamingResponse(stream_results(), media_type=media_type)
+    headers = {"X-Session-Id": session.session_id}
+    return StreamingResponse(stream_into_session(), media_type=media_type, headers=headers)
+
+@app.post("/rank-resumes/{session_id}/delta")
+async def rerank_session(
+    request: Request,
+    session_id: str,
+    add_skills: str = Form(""),
+    remove_skills: str = Form("")
+):
+    """
+    Re-ranks the resumes of an earlier keep_session=true request after
+    adding/removing skills. Only the changed skills are looked up.
+    """
+    start_time = time.time()
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found or expired")
+    if session.aborted:
+        raise HTTPException(status_code=410, detail=f"Session {session_id} was aborted before all results were sent")
+    if not session.complete:
+        raise HTTPException(status_code=409, detail=f"Session {session_id} is still processing")
+
+    added = [s.strip().lower() for s in add_skills.split(",") if s.strip()]
+    removed = [s.strip().lower() for s in remove_skills.split(",") if s.strip()]
+    if not added and not set(session.target_skills) - set(removed):
+        raise HTTPException(status_code=400, detail="No skills left after the delta")
+    rankings = session.rerank(added, removed)
+
+    payload = {
+        "session_id": session_id,
+        "requested_skills": session.target_skills,
+        "total_files_processed": len(rankings),
+        "rerank_time_sec": round(time.time() - start_time, 3),
+        "rankings": rankings
+    }
+    media_type = negotiate(request.headers.get("accept"), BATCH_FORMATS)
+    if media_type == JSON:
+        return payload
+    return Response(content=encode_batch(payload, media_type), media_type=media_type)
+
+def parse_text_record(raw, position):
+    try:
+        record = json.loads(raw) if isinstance(raw, bytes) else raw
+    except ValueError:
+        record = None
+    if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+        return None
+    return {"id": record.get("id", position), "text": record["text"]}
+
+@app.post("/rank-texts")
+async def rank_texts(request: Request, skills: str, ranked: bool = False):
+    """
+    Ranks resumes that are already text. The body is either NDJSON
+    (one {"id": ..., "text": ...} per line) or a JSON array.
+    NDJSON batches go to the workers while the body is still uploading.
+    Results come back as NDJSON per record; ranked=true sorts them by score.
+    """
+    target_skills = parse_skills(skills)
+    loop = asyncio.get_event_loop()
+    if int(request.headers.get("content-length") or 0) > MAX_TEXT_BODY_SIZE:
+        raise HTTPException(status_code=413, detail=f"Body exceeds {MAX_TEXT_BODY_SIZE // (1024 * 1024)}MB limit.")
+
+    async def read_body():
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_TEXT_BODY_SIZE:
+                raise HTTPException(status_code=413, detail=f"Body exceeds {MAX_TEXT_BODY_SIZE // (1024 * 1024)}MB limit.")
+            yield chunk
+
+    async def read_records():
+        if "ndjson" not in request.headers.get("content-type", ""):
+            body = bytearray()
+            async for chunk in read_body():
+                body += chunk
+            try:
+                records = json.loads(body)
+            except ValueError:
+                records = None
+            if not isinstance(records, list):
+                raise HTTPException(status_code=400, detail="Expected a JSON array of {id, text} records")
+            for position, record in enumerate(records):
+                yield record, position
+            return
+
+        buffer = b""
+        position = 0
+        async for chunk in read_body():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line, position
+                    position += 1
+        if buffer.strip():
+            yield buffer, position
+
+    # The body has to be consumed before the response starts, so batches are
+    # dispatched while reading and whatever is done by then is sent first.
+    finished = []
+    pending = set()
+    batch_ids = {}
+
+    def dispatch(batch):
+        task = loop.run_in_executor(text_executor, match_text_batch, batch, target_skills)
+        batch_ids[task] = [r["id"] for r in batch]
+        pending.add(task)
+
+    def batch_results(task):
+        ids = batch_ids.pop(task)
+        try:
+            return task.result()
+        except Exception as e:
+            # e.g. a broken worker pool; report every record of the batch and keep going
+            return [{"status": "error", "id": i, "error": str(e)} for i in ids]
+
+    async def wait_for(limit):
+        nonlocal pending
+        while len(pending) > limit:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                finished.extend(batch_results(task))
+
+    batch = []
+    try:
+        async for raw, position in read_records():
+            if position >= MAX_TEXT_RECORDS:
+                raise HTTPException(status_code=413, detail=f"Too many records! Maximum allowed is {MAX_TEXT_RECORDS}.")
+            record = parse_text_record(raw, position)
+            if record is None:
+                # No usable id: report where it was, so it can't collide with a real id
+                finished.append({"status": "error", "id": None, "position": position, "error": "Expected {\"id\": ..., \"text\": \"...\"}"})
+                continue
+            if len(record["text"]) > MAX_TEXT_LENGTH:
+                raise HTTPException(status_code=413, detail=f"Record {record['id']} exceeds {MAX_TEXT_LENGTH} characters.")
+            batch.append(record)
+            if len(batch) >= TEXT_BATCH_SIZE:
+                dispatch(batch)
+                batch = []
+                # Backpressure: stop reading the body while the workers are busy
+                await wait_for(MAX_TEXT_BATCHES_IN_FLIGHT - 1)
+    except HTTPException:
+        for task in pending:
+            task.cancel()
+        raise
+    if batch:
+        dispatch(batch)
+
+    async def stream_results():
+        nonlocal pending
+        if ranked:
+            await wait_for(0)
+            finished.sort(key=lambda x: x.get("score", 0), reverse=True)
+            for result in finished:
+                yield json.dumps(result) + "\n"
+            return
+
+        yield "".join(json.dumps(r) + "\n" for r in finished)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield "".join(json.dumps(r) + "\n" for r in batch_results(task))
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+# ------------------ INDEX ENDPOINTS ------------------
+
+def search_indexes(clauses, index_ids):
+    matches = []
+    for index_id in index_ids:
+        try:
+            index = load_index(index_id)
+        except FileNotFoundError:
+            continue
+        hits = run_query(clauses, index)
+        if hits:
+            matches.append({
+                "index_id": index_id,
+                "filename": index.metadata["filename"],
+                "score": sum(hits.values()),
+                "hits": hits
+            })
+    matches.sort(key=lambda x: x["score"], reverse=True)
+    return matches
+
+@app.post("/index/query")
+async def query_index(
+    query: str = Form(...),
+    index_ids: str = Form(""),
+    limit: int = Form(100)
+):
+    """
+    Phrase / proximity search over resumes processed with build_index=true,
+    answered from the stored positional indexes alone, e.g.
+    "senior engineer" python NEAR/5 django
+    """
+    start_time = time.time()
+    clauses = parse_query(query)
+    if not clauses:
+        raise HTTPException(status_code=400, detail="Empty query")
+
+    ids = [i.strip() for i in index_ids.split(",") if i.strip()] or list_index_ids()
+    for index_id in ids:
+        if not INDEX_ID_PATTERN.match(index_id):
+            raise HTTPException(status_code=400, detail=f"Invalid index id {index_id}")
+
+    loop = asyncio.get_event_loop()
+    matches = await loop.run_in_executor(None, search_indexes, clauses, ids)
+    return {
+        "query": query,
+        "clauses": [c["text"] for c in clauses],
+        "total_indexes_searched": len(ids),
+        "total_matches": len(matches),
+        "query_time_sec": round(time.time() - start_time, 3),
+        "matches": matches[:limit]
+    }
+
+# ------------------ JOB ENDPOINTS ------------------
+
+@app.on_event("startup")
+async def start_job_runner():
+    global job_store, job_runner
+    job_store = JobStore()
+    job_runner = JobRunner(job_store, executor, process_single_resume, JOB_CONCURRENCY)
+    job_runner.start()
+
+def get_job_or_404(job_id):
+    job = job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+async def enqueue_files(job_id, files):
+    file_data = await asyncio.gather(*[read_upload(f) for f in files])
+    # Spooling up to 300 x 5MB to disk must not stall the live streams on this loop
+    added = await asyncio.to_thread(job_store.add_files, job_id, file_data)
+    job_runner.notify()
+    return added
+
+@app.post("/jobs")
+async def create_job(
+    skills: str = Form(...),
+    files: List[UploadFile] = File(None),
+    close: bool = Form(False)
+):
+    """
+    Starts a job. More files can be appended in chunks of up to MAX_RESUME_COUNT
+    with POST /jobs/{job_id}/files; send close=true with the last chunk.
+    """
+    target_skills = parse_skills(skills)
+    if files:
+        check_files(files)
+    job_id = job_store.create_job(target_skills)
+    if files:
+        await enqueue_files(job_id, files)
+    if close:
+        job_store.close_job(job_id)
+    return await asyncio.to_thread(job_store.progress, job_id)
+
+@app.post("/jobs/{job_id}/files")
+async def add_job_files(
+    job_id: str,
+    files: List[UploadFile] = File(...),
+    close: bool = Form(False)
+):
+    job = get_job_or_404(job_id)
+    if job["closed"]:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is closed")
+    check_files(files)
+    await enqueue_files(job_id, files)
+    if close:
+        job_store.close_job(job_id)
+    return await asyncio.to_thread(job_store.progress, job_id)
+
+@app.post("/jobs/{job_id}/close")
+async def close_job(job_id: str):
+    get_job_or_404(job_id)
+    job_store.close_job(job_id)
+    return await asyncio.to_thread(job_store.progress, job_id)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    get_job_or_404(job_id)
+    return await asyncio.to_thread(job_store.progress, job_id)
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Deletes a job with its queued files and results; files still running are discarded."""
+    get_job_or_404(job_id)
+    await asyncio.to_thread(job_store.delete_job, job_id)
+    return {"job_id": job_id, "status": "deleted"}
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(job_id: str, offset: int = 0, follow: bool = False):
+    """
+    Streams finished results as NDJSON, starting after the first `offset`.
+    With follow=true the stream stays open until the job is completed.
+    """
+    get_job_or_404(job_id)
+
+    async def stream_results():
+        sent = offset
+        while True:
+            batch = await asyncio.to_thread(job_store.results, job_id, sent)
+            for result in batch:
+                yield json.dumps(result) + "\n"
+            sent += len(batch)
+            if batch:
+                continue
+            progress = await asyncio.to_thread(job_store.progress, job_id)
+            if progress is None:
+                break  # deleted while streaming
+            if not follow or progress["status"] == "completed":
+                # One last read in case results landed between the two queries
+                for result in await asyncio.to_thread(job_store.results, job_id, sent):
+                    yield json.dumps(result) + "\n"
+                break
+            await asyncio.sleep(1)
 
     return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
+# ------------------ DEBUG ENDPOINTS ------------------
+
+@app.get("/debug/profiles")
+async def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return {"profiles": []}
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith(".json"):
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                profiles.append(json.load(f))
+    profiles.sort(key=lambda p: p["created_at"], reverse=True)
+    return {"profiles": profiles}
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, limit: int = 30):
+    metadata = load_profile_metadata(profile_id)
+    out = io.StringIO()
+    stats = pstats.Stats(os.path.join(PROFILE_DIR, profile_id + ".prof"), stream=out)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return {**metadata, "stats": out.getvalue()}
+
+@app.get("/debug/workers")
+async def worker_status():
+    if not WORKER_NODES:
+        return {"mode": "local", **executor.stats()}
+    return {"mode": "distributed", "nodes": executor.status()}
+
+@app.get("/debug/profiles/{profile_id}/raw")
+async def download_profile(profile_id: str):
+    load_profile_metadata(profile_id)
+    return FileResponse(
+        os.path.join(PROFILE_DIR, profile_id + ".prof"),
+        media_type="application/octet-stream",
+        filename=profile_id + ".prof"
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,83 @@
+import re
+import hashlib
+import numpy as np
+
+# ------------------ CONFIG ------------------
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3               # words per shingle fed into the SimHash
+NEAR_DUPLICATE_DISTANCE = 3    # max differing bits for two texts to count as the same CV
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# ------------------ FINGERPRINTS ------------------
+
+def content_hash(file_bytes):
+    """Exact fingerprint of the uploaded bytes."""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+def simhash(text):
+    """
+    64-bit SimHash over word shingles of the extracted text.
+    Re-exports of the same CV land within a few bits of each other,
+    even when the file bytes are completely different.
+    Returns None when there is no text to fingerprint.
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if not tokens:
+        return None
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = tokens
+    else:
+        shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # Per bit: +1 for every shingle hash that has it set, -1 for every one that doesn't
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    set_bits = np.flatnonzero(2 * bits.sum(axis=0, dtype=np.int64) > len(shingles))
+    return sum(1 << int(bit) for bit in set_bits)
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+# ------------------ GROUPING ------------------
+
+def group_exact_duplicates(file_data):
+    """
+    Splits [(file_bytes, filename), ...] into the unique files to process
+    and the filenames of every copy, keyed by content hash.
+    Returns (unique, copies) where unique is [(file_bytes, filename, hash), ...]
+    and copies maps hash -> [canonical filename, duplicate filenames...].
+    """
+    unique = []
+    copies = {}
+    for content, name in file_data:
+        h = content_hash(content)
+        if h in copies:
+            copies[h].append(name)
+        else:
+            copies[h] = [name]
+            unique.append((content, name, h))
+    return unique, copies
+
+class NearDuplicateIndex:
+    """Remembers the SimHash of every canonical resume seen in one batch."""
+
+    def __init__(self, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.max_distance = max_distance
+        self.canonical = []  # (fingerprint, filename)
+
+    def match(self, fingerprint, filename):
+        """
+        Returns the filename of an earlier near-identical resume, or None.
+        Resumes without a match become canonical for later ones.
+        """
+        if fingerprint is None:
+            return None
+        for seen, canonical_name in self.canonical:
+            if hamming_distance(seen, fingerprint) <= self.max_distance:
+                return canonical_name
+        self.canonical.append((fingerprint, filename))
+        return None
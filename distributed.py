@@ -0,0 +1,289 @@
+"""
+Distributed execution for the resume workers.
+
+The API node keeps calling loop.run_in_executor(executor, ...) as before;
+with WORKER_NODES set, `executor` is a DistributedExecutor that ships each
+task to one of several worker nodes over TCP or Unix sockets.
+
+Start a worker node (on any machine that has the normal requirements), with
+the same WORKER_TOKEN as the API node; requests without it are refused:
+    WORKER_TOKEN=... python distributed.py --listen 10.0.0.5:9100 --workers 4
+    WORKER_TOKEN=... python distributed.py --listen unix:/tmp/resume-worker.sock
+"""
+import os
+import hmac
+import json
+import time
+import socket
+import struct
+import argparse
+import importlib
+import threading
+import socketserver
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from pool_sizing import AdaptiveProcessPool, pool_bounds
+
+# ------------------ CONFIG ------------------
+HEARTBEAT_INTERVAL_SEC = 5      # how often the coordinator pings every node
+CONNECT_TIMEOUT_SEC = 3
+TASK_TIMEOUT_SEC = 300          # a single resume should never take this long
+MAX_RETRIES = 3                 # attempts per task, each on a different live node if possible
+WORKER_TOKEN = os.environ.get("WORKER_TOKEN", "")   # shared secret sent in every header frame
+
+# Only these worker functions may be called remotely (looked up in api_v3)
+REMOTE_TASKS = {"process_single_resume", "profiled_process_single_resume"}
+
+# ------------------ WIRE PROTOCOL ------------------
+# Every frame is a 4-byte big-endian length followed by the body.
+# A message is one JSON header frame, plus a raw payload frame for tasks
+# (the file bytes, so they never go through JSON) and for results that carry
+# a profile (the marshalled cProfile stats).
+
+def send_frame(sock, body):
+    sock.sendall(struct.pack(">I", len(body)) + body)
+
+def recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def recv_frame(sock):
+    (size,) = struct.unpack(">I", recv_exact(sock, 4))
+    return recv_exact(sock, size)
+
+def send_message(sock, header, payload=None):
+    send_frame(sock, json.dumps(header).encode())
+    if payload is not None:
+        send_frame(sock, payload)
+
+def recv_message(sock):
+    return json.loads(recv_frame(sock))
+
+def valid_task_args(args):
+    """Wire args must be (filename, target_skills, keep_tokens=False, build_index=False, fingerprint=False)."""
+    if not isinstance(args, list) or not 2 <= len(args) <= 5:
+        return False
+    filename, skills, *flags = args
+    return isinstance(filename, str) and isinstance(skills, list) \
+        and all(isinstance(s, str) for s in skills) and all(isinstance(f, bool) for f in flags)
+
+def connect(address, timeout):
+    """Addresses are 'host:port' or 'unix:/path/to.sock'."""
+    if address.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address[len("unix:"):])
+    else:
+        host, port = address.rsplit(":", 1)
+        sock = socket.create_connection((host, int(port)), timeout=timeout)
+    return sock
+
+# ------------------ COORDINATOR SIDE ------------------
+
+class WorkerNode:
+    def __init__(self, address):
+        self.address = address
+        self.alive = True        # optimistic until the first heartbeat says otherwise
+        self.workers = 1
+        self.in_flight = 0
+        self.last_seen = 0.0
+
+    def load(self):
+        return self.in_flight / self.workers
+
+class DistributedExecutor(Executor):
+    """
+    concurrent.futures.Executor that runs tasks on remote worker nodes.
+    Dead nodes are skipped until a heartbeat succeeds again, and a task whose
+    node fails mid-flight is retried on another node.
+    """
+
+    def __init__(self, addresses, max_in_flight=None):
+        self.nodes = [WorkerNode(a) for a in addresses]
+        self.lock = threading.Lock()
+        self.node_available = threading.Condition(self.lock)
+        self.dispatchers = ThreadPoolExecutor(
+            max_workers=max_in_flight or 16 * len(self.nodes),
+            thread_name_prefix="resume-dispatch"
+        )
+        self.stopped = threading.Event()
+        self.heartbeat_thread = threading.Thread(target=self.heartbeat_loop, daemon=True)
+        self.heartbeat_thread.start()
+
+    def submit(self, fn, /, *args, **kwargs):
+        if fn.__name__ not in REMOTE_TASKS or kwargs:
+            raise ValueError(f"{fn.__name__} cannot be run on a worker node")
+        future = Future()
+        self.dispatchers.submit(self.dispatch, future, fn.__name__, args)
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.stopped.set()
+        self.dispatchers.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    # --- node selection ---
+
+    def acquire_node(self, exclude):
+        deadline = time.time() + HEARTBEAT_INTERVAL_SEC * 2
+        with self.node_available:
+            while True:
+                candidates = [n for n in self.nodes if n.alive and n not in exclude]
+                if not candidates:
+                    # Fall back to nodes that already failed this task rather than giving up
+                    candidates = [n for n in self.nodes if n.alive]
+                if candidates:
+                    node = min(candidates, key=WorkerNode.load)
+                    node.in_flight += 1
+                    return node
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.node_available.wait(remaining)
+
+    def release_node(self, node, failed):
+        with self.node_available:
+            node.in_flight -= 1
+            if failed:
+                node.alive = False
+            self.node_available.notify_all()
+
+    # --- task execution ---
+
+    def dispatch(self, future, fn_name, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        file_bytes, rest = args[0], list(args[1:])
+        tried = []
+        last_error = None
+        for _ in range(MAX_RETRIES):
+            node = self.acquire_node(tried)
+            if node is None:
+                break
+            tried.append(node)
+            try:
+                with connect(node.address, CONNECT_TIMEOUT_SEC) as sock:
+                    sock.settimeout(TASK_TIMEOUT_SEC)
+                    send_message(sock, {"op": "task", "token": WORKER_TOKEN, "fn": fn_name, "args": rest}, file_bytes)
+                    try:
+                        reply = recv_message(sock)
+                        if reply.get("profile") is not None:
+                            reply["result"]["profile"] = {"metadata": reply["profile"], "stats": recv_frame(sock)}
+                    except socket.timeout:
+                        # The node is alive but this file is pathological: retrying
+                        # would only tie up more nodes with the same file
+                        self.release_node(node, failed=False)
+                        future.set_exception(TimeoutError(
+                            f"{args[1]} did not finish within {TASK_TIMEOUT_SEC}s on {node.address}"
+                        ))
+                        return
+            except (OSError, ConnectionError, ValueError) as e:
+                # Connect failures and resets: the node is gone, try another one
+                last_error = e
+                self.release_node(node, failed=True)
+                continue
+            self.release_node(node, failed=False)
+            if reply.get("op") == "error":
+                future.set_exception(RuntimeError(reply["error"]))
+            else:
+                future.set_result(reply["result"])
+            return
+        future.set_exception(RuntimeError(f"No worker node could run the task: {last_error or 'no live nodes'}"))
+
+    def heartbeat_loop(self):
+        while not self.stopped.is_set():
+            for node in self.nodes:
+                try:
+                    with connect(node.address, CONNECT_TIMEOUT_SEC) as sock:
+                        send_message(sock, {"op": "ping", "token": WORKER_TOKEN})
+                        pong = recv_message(sock)
+                    # A node that rejects our token is as unusable as a dead one
+                    alive = pong.get("op") == "pong"
+                except (OSError, ConnectionError, ValueError):
+                    alive = False
+                with self.node_available:
+                    node.alive = alive
+                    if alive:
+                        node.workers = max(1, pong.get("workers", 1))
+                        node.last_seen = time.time()
+                    self.node_available.notify_all()
+            self.stopped.wait(HEARTBEAT_INTERVAL_SEC)
+
+    def status(self):
+        with self.lock:
+            return [
+                {
+                    "address": n.address,
+                    "alive": n.alive,
+                    "workers": n.workers,
+                    "in_flight": n.in_flight,
+                    "last_seen": n.last_seen,
+                }
+                for n in self.nodes
+            ]
+
+# ------------------ WORKER NODE SIDE ------------------
+
+class TaskHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        header = recv_message(self.request)
+        if not hmac.compare_digest(str(header.get("token", "")).encode(), WORKER_TOKEN.encode()):
+            send_message(self.request, {"op": "error", "error": "Invalid worker token"})
+            return
+        if header.get("op") == "ping":
+            send_message(self.request, {"op": "pong", "workers": self.server.pool.size})
+            return
+        if header.get("op") != "task" or header.get("fn") not in REMOTE_TASKS or not valid_task_args(header.get("args")):
+            send_message(self.request, {"op": "error", "error": f"Unknown request: {header.get('op')}"})
+            return
+
+        file_bytes = recv_frame(self.request)
+        fn = getattr(importlib.import_module("api_v3"), header["fn"])
+        try:
+            result = self.server.pool.submit(fn, file_bytes, *header["args"]).result()
+            profile = result.pop("profile", None)
+            if profile is None:
+                send_message(self.request, {"op": "result", "result": result})
+            else:
+                send_message(self.request, {"op": "result", "result": result, "profile": profile["metadata"]}, profile["stats"])
+        except Exception as e:
+            send_message(self.request, {"op": "error", "error": str(e)})
+
+class TCPWorkerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class UnixWorkerServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+def serve(listen, workers):
+    if os.environ.get("WORKER_NODES"):
+        # api_v3 would hand our tasks straight back to the network
+        raise SystemExit("Unset WORKER_NODES before starting a worker node")
+    if not WORKER_TOKEN:
+        raise SystemExit("Set WORKER_TOKEN (shared with the API node) before starting a worker node")
+    if listen.startswith("unix:"):
+        path = listen[len("unix:"):]
+        if os.path.exists(path):
+            os.remove(path)
+        server = UnixWorkerServer(path, TaskHandler)
+    else:
+        host, port = listen.rsplit(":", 1)
+        server = TCPWorkerServer((host, int(port)), TaskHandler)
+    server.pool = AdaptiveProcessPool(max_workers=workers)
+    print(f"Resume worker node listening on {listen} with up to {server.pool.max_workers} workers")
+    try:
+        server.serve_forever()
+    finally:
+        server.pool.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resume processing worker node")
+    parser.add_argument("--listen", default="127.0.0.1:9100", help="host:port or unix:/path")
+    parser.add_argument("--workers", type=int, default=pool_bounds()[1], help="maximum worker processes")
+    args = parser.parse_args()
+    serve(args.listen, args.workers)
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import asyncio
+import threading
+
+# ------------------ CONFIG ------------------
+JOBS_DIR = os.environ.get("JOBS_DIR", "jobs")   # SQLite database + spooled uploads
+POLL_INTERVAL_SEC = 1.0                         # how often idle runners / followers re-check the queue
+JOB_TTL_SEC = int(os.environ.get("JOB_TTL_SEC", 7 * 24 * 60 * 60))  # idle jobs and their results are purged after this
+PURGE_INTERVAL_SEC = 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    skills TEXT NOT NULL,
+    closed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    PRIMARY KEY (job_id, seq)
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_files_state ON job_files (state, job_id, seq);
+CREATE INDEX IF NOT EXISTS job_results_job ON job_results (job_id, id);
+"""
+
+# ------------------ DURABLE STORE ------------------
+
+class JobStore:
+    """
+    SQLite-backed queue of resume files.
+    Uploads are spooled to disk so a restart picks up where it left off.
+    """
+
+    def __init__(self, root=JOBS_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, "spool"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "jobs.db"), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.next_seq = {}  # job_id -> first seq not yet handed to an add_files call
+        with self.lock, self.db:
+            self.db.executescript(SCHEMA)
+            # Files that were mid-flight when the process died go back in the queue
+            self.db.execute("UPDATE job_files SET state = 'pending' WHERE state = 'running'")
+
+    def create_job(self, target_skills):
+        job_id = uuid.uuid4().hex
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO jobs (id, skills, created_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(target_skills), time.time())
+            )
+        os.makedirs(os.path.join(self.root, "spool", job_id), exist_ok=True)
+        return job_id
+
+    def get_job(self, job_id):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def add_files(self, job_id, file_data):
+        """Spools [(file_bytes, filename), ...] to disk and queues them."""
+        with self.lock:
+            # Reserve the whole seq range up front so concurrent chunks never share spool files
+            start = max(self.next_seq.get(job_id, 0), self.db.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM job_files WHERE job_id = ?", (job_id,)
+            ).fetchone()[0])
+            self.next_seq[job_id] = start + len(file_data)
+        rows = []
+        for seq, (content, name) in enumerate(file_data, start=start):
+            path = os.path.join(self.root, "spool", job_id, str(seq))
+            with open(path, "wb") as f:
+                f.write(content)
+            rows.append((job_id, seq, name, path))
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT INTO job_files (job_id, seq, filename, path) VALUES (?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def delete_job(self, job_id):
+        """Drops a job, its queued files and its results."""
+        with self.lock, self.db:
+            for table, column in (("job_results", "job_id"), ("job_files", "job_id"), ("jobs", "id")):
+                self.db.execute(f"DELETE FROM {table} WHERE {column} = ?", (job_id,))
+            self.next_seq.pop(job_id, None)
+        shutil.rmtree(os.path.join(self.root, "spool", job_id), ignore_errors=True)
+
+    def purge_expired(self, ttl=JOB_TTL_SEC):
+        """Deletes jobs older than `ttl` that have nothing left pending or running."""
+        with self.lock:
+            expired = [r["id"] for r in self.db.execute(
+                "SELECT id FROM jobs WHERE created_at < ? AND NOT EXISTS ("
+                "SELECT 1 FROM job_files f WHERE f.job_id = jobs.id AND f.state != 'done')",
+                (time.time() - ttl,)
+            ).fetchall()]
+        for job_id in expired:
+            self.delete_job(job_id)
+        return len(expired)
+
+    def close_job(self, job_id):
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET closed = 1 WHERE id = ?", (job_id,))
+
+    def claim(self, limit):
+        """Marks up to `limit` pending files as running, oldest job first."""
+        with self.lock, self.db:
+            rows = self.db.execute(
+                "SELECT f.job_id, f.seq, f.filename, f.path, j.skills FROM job_files f "
+                "JOIN jobs j ON j.id = f.job_id WHERE f.state = 'pending' "
+                "ORDER BY j.created_at, f.seq LIMIT ?", (limit,)
+            ).fetchall()
+            self.db.executemany(
+                "UPDATE job_files SET state = 'running' WHERE job_id = ? AND seq = ?",
+                [(r["job_id"], r["seq"]) for r in rows]
+            )
+        return [dict(r) for r in rows]
+
+    def finish(self, job_id, seq, path, result):
+        with self.lock, self.db:
+            if self.db.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+                return  # deleted while this file was running
+            self.db.execute(
+                "INSERT INTO job_results (job_id, seq, result) VALUES (?, ?, ?)",
+                (job_id, seq, json.dumps(result))
+            )
+            self.db.execute(
+                "UPDATE job_files SET state = 'done' WHERE job_id = ? AND seq = ?", (job_id, seq)
+            )
+        if os.path.exists(path):
+            os.remove(path)
+
+    def progress(self, job_id):
+        with self.lock:
+            counts = dict(self.db.execute(
+                "SELECT state, COUNT(*) FROM job_files WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall())
+            job = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        total = sum(counts.values())
+        done = counts.get("done", 0)
+        if not job["closed"]:
+            status = "open"
+        elif done == total:
+            status = "completed"
+        else:
+            status = "running"
+        return {
+            "job_id": job_id,
+            "status": status,
+            "requested_skills": json.loads(job["skills"]),
+            "total_files": total,
+            "completed_files": done,
+            "pending_files": counts.get("pending", 0),
+            "running_files": counts.get("running", 0),
+        }
+
+    def results(self, job_id, offset=0, limit=1000):
+        """Results in completion order; `offset` is how many the client already has."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT result FROM job_results WHERE job_id = ? ORDER BY id LIMIT ? OFFSET ?",
+                (job_id, limit, offset)
+            ).fetchall()
+        return [json.loads(r["result"]) for r in rows]
+
+# ------------------ BACKGROUND RUNNER ------------------
+
+def read_spooled(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+class JobRunner:
+    """
+    Feeds queued job files into the shared process pool, keeping at most
+    `concurrency` of them in flight so live requests are not starved.
+    """
+
+    def __init__(self, store, executor, worker, concurrency):
+        self.store = store
+        self.executor = executor
+        self.worker = worker
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.last_purge = 0.0
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def notify(self):
+        self.wakeup.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if time.time() - self.last_purge > PURGE_INTERVAL_SEC:
+                self.last_purge = time.time()
+                await asyncio.to_thread(self.store.purge_expired)
+            free = self.concurrency - self.in_flight
+            claimed = await asyncio.to_thread(self.store.claim, free) if free > 0 else []
+            for item in claimed:
+                self.in_flight += 1
+                loop.create_task(self.process(loop, item))
+            if not claimed:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), POLL_INTERVAL_SEC)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def process(self, loop, item):
+        try:
+            content = await asyncio.to_thread(read_spooled, item["path"])
+            skills = json.loads(item["skills"])
+            result = await loop.run_in_executor(self.executor, self.worker, content, item["filename"], skills)
+        except Exception as e:
+            result = {"status": "error", "filename": item["filename"], "error": str(e)}
+        # SQLite commit + spool cleanup stay off the event loop serving live streams
+        await asyncio.to_thread(self.store.finish, item["job_id"], item["seq"], item["path"], result)
+        self.in_flight -= 1
+        self.wakeup.set()
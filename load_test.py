@@ -0,0 +1,253 @@
+"""
+Load generator for the streaming /rank-resumes API.
+
+Replays request mixes described in a JSONL file, one mix per line:
+    {"name": "mixed-intake", "requests": 200, "concurrency": 16, "arrival_rate": 5,
+     "files": {"pdf": 20, "docx": 5, "png": 2}, "skills": ["python", "aws", "sql"]}
+
+- files:         how many files of each type go into every request, picked at random from --corpus
+- concurrency:   maximum requests in flight
+- arrival_rate:  requests per second with Poisson arrivals; omit it for a closed loop
+                 where `concurrency` clients fire back to back
+- accept:        optional Accept header: NDJSON (default), columnar NDJSON or MessagePack
+- dedup:         let the server skip byte-identical uploads (default false; samples repeat
+                 across a request, so dedup would hide most of the work)
+
+Usage:
+    python load_test.py load_mixes.example.jsonl --corpus resumes/ --out report.json
+    python load_test.py load_mixes.example.jsonl --corpus resumes/ --baseline report.json
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import httpx
+from result_formats import StreamDecoder, STREAM_FORMATS, NDJSON
+
+# ------------------ CONFIG ------------------
+DEFAULT_BASE_URL = "http://localhost:8000"
+REQUEST_TIMEOUT_SEC = 600
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+# ------------------ INPUT ------------------
+
+def load_mixes(path):
+    with open(path) as f:
+        mixes = [json.loads(line) for line in f if line.strip()]
+    for mix in mixes:
+        if mix.get("accept", NDJSON) not in STREAM_FORMATS:
+            raise SystemExit(f"Mix '{mix.get('name')}' asks for {mix['accept']}; supported: {', '.join(STREAM_FORMATS)}")
+    return mixes
+
+def load_corpus(folder):
+    """Groups sample resumes by extension so mixes can ask for e.g. 3 PDFs."""
+    corpus = {}
+    for filename in sorted(os.listdir(folder)):
+        ext = filename.lower().split('.')[-1]
+        if ext in MIME_TYPES:
+            with open(os.path.join(folder, filename), "rb") as f:
+                corpus.setdefault(ext, []).append((filename, f.read()))
+    return corpus
+
+def build_files(mix, corpus, rng):
+    files = []
+    for ext, count in mix.get("files", {}).items():
+        samples = corpus.get(ext)
+        if not samples:
+            raise SystemExit(f"Mix '{mix['name']}' needs .{ext} files but the corpus has none")
+        for i in range(count):
+            name, content = rng.choice(samples)
+            files.append(("files", (f"{i}-{name}", content, MIME_TYPES[ext])))
+    return files
+
+# ------------------ STATS ------------------
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank], 4)
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 4) if values else None,
+    }
+
+# ------------------ DRIVER ------------------
+
+async def send_request(client, url, mix, files):
+    """One /rank-resumes call; times the first byte and every streamed result."""
+    # ttfb is the first decoded result, so formats that send a header record up
+    # front stay comparable with NDJSON; first_byte is whatever arrived first
+    sample = {"status_code": None, "ttfb": None, "first_byte": None, "line_latencies": [], "line_gaps": [],
+              "lines": 0, "file_errors": 0, "total": None, "error": None}
+    headers = {"accept": mix["accept"]} if mix.get("accept") else {}
+    data = {
+        "skills": ",".join(mix.get("skills", ["python"])),
+        "dedup": "true" if mix.get("dedup", False) else "false",
+    }
+    start = time.perf_counter()
+    try:
+        async with client.stream("POST", url, data=data, files=files, headers=headers) as response:
+            sample["status_code"] = response.status_code
+            # Decode whatever format was negotiated; a header record is not a result
+            media_type = response.headers.get("content-type", NDJSON).split(";")[0].strip()
+            decoder = StreamDecoder(media_type if media_type in STREAM_FORMATS else NDJSON)
+            last_line = start
+            async for chunk in response.aiter_bytes():
+                now = time.perf_counter()
+                if sample["first_byte"] is None:
+                    sample["first_byte"] = now - start
+                if response.status_code != 200:
+                    continue
+                for record in decoder.feed(chunk):
+                    if sample["ttfb"] is None:
+                        sample["ttfb"] = now - start
+                    sample["lines"] += 1
+                    sample["line_latencies"].append(now - start)
+                    sample["line_gaps"].append(now - last_line)
+                    last_line = now
+                    if record.get("status") == "error":
+                        sample["file_errors"] += 1
+    except httpx.HTTPError as e:
+        sample["error"] = f"{type(e).__name__}: {e}"
+    except ValueError as e:
+        # Undecodable NDJSON / MessagePack
+        sample["error"] = f"Bad response body: {e}"
+    sample["total"] = time.perf_counter() - start
+    return sample
+
+async def run_mix(mix, corpus, base_url, seed):
+    rng = random.Random(seed)
+    url = base_url.rstrip("/") + mix.get("endpoint", "/rank-resumes")
+    count = mix.get("requests", 10)
+    concurrency = mix.get("concurrency", 1)
+    arrival_rate = mix.get("arrival_rate")
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT_SEC, limits=limits) as client:
+        async def one(files):
+            queued = time.perf_counter()
+            async with semaphore:
+                sample = await send_request(client, url, mix, files)
+            sample["queue_wait"] = time.perf_counter() - queued - sample["total"]
+            sample["files"] = len(files)
+            samples.append(sample)
+
+        start = time.perf_counter()
+        tasks = []
+        for _ in range(count):
+            tasks.append(asyncio.create_task(one(build_files(mix, corpus, rng))))
+            if arrival_rate:
+                await asyncio.sleep(rng.expovariate(arrival_rate))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start
+
+    return report_mix(mix, samples, wall)
+
+def report_mix(mix, samples, wall):
+    ok = [s for s in samples if s["status_code"] == 200 and s["error"] is None]
+    total_files = sum(s["files"] for s in ok)
+    return {
+        "name": mix["name"],
+        "mix": mix,
+        "requests": len(samples),
+        "ok": len(ok),
+        "http_429": sum(1 for s in samples if s["status_code"] == 429),
+        "http_errors": sum(1 for s in samples if s["status_code"] not in (None, 200, 429)),
+        "transport_errors": sum(1 for s in samples if s["error"] is not None),
+        "error_rate": round(1 - len(ok) / len(samples), 4) if samples else None,
+        "file_error_rate": round(sum(s["file_errors"] for s in ok) / total_files, 4) if total_files else None,
+        "wall_time_sec": round(wall, 3),
+        "requests_per_sec": round(len(ok) / wall, 3) if wall else None,
+        "files_per_sec": round(total_files / wall, 3) if wall else None,
+        "ttfb_sec": summarize([s["ttfb"] for s in ok if s["ttfb"] is not None]),
+        "first_byte_sec": summarize([s["first_byte"] for s in ok if s["first_byte"] is not None]),
+        "line_latency_sec": summarize([v for s in ok for v in s["line_latencies"]]),
+        "line_gap_sec": summarize([v for s in ok for v in s["line_gaps"]]),
+        "total_sec": summarize([s["total"] for s in ok]),
+        "queue_wait_sec": summarize([s["queue_wait"] for s in samples]),
+    }
+
+# ------------------ REPORTING ------------------
+
+# (label, path into a mix report, True if lower is better)
+TABLE_METRICS = [
+    ("req/s", ("requests_per_sec",), False),
+    ("files/s", ("files_per_sec",), False),
+    ("error rate", ("error_rate",), True),
+    ("429s", ("http_429",), True),
+    ("ttfb p50", ("ttfb_sec", "p50"), True),
+    ("ttfb p99", ("ttfb_sec", "p99"), True),
+    ("line p50", ("line_latency_sec", "p50"), True),
+    ("line p99", ("line_latency_sec", "p99"), True),
+    ("total p99", ("total_sec", "p99"), True),
+]
+
+def lookup(report, path):
+    for key in path:
+        if report is None:
+            return None
+        report = report.get(key)
+    return report
+
+def print_report(reports, baseline=None):
+    previous = {r["name"]: r for r in (baseline or {}).get("mixes", [])}
+    for report in reports:
+        print(f"\n=== {report['name']} ({report['ok']}/{report['requests']} ok) ===")
+        old = previous.get(report["name"])
+        for label, path, lower_is_better in TABLE_METRICS:
+            value = lookup(report, path)
+            line = f"{label:>12}: {value}"
+            before = lookup(old, path)
+            if value is not None and before:
+                change = (value - before) / before * 100
+                worse = change > 0 if lower_is_better else change < 0
+                line += f"   (baseline {before}, {change:+.1f}%{' REGRESSION' if worse and abs(change) > 10 else ''})"
+            print(line)
+
+async def main(args):
+    mixes = load_mixes(args.mixes)
+    corpus = load_corpus(args.corpus)
+    reports = []
+    for i, mix in enumerate(mixes):
+        mix.setdefault("name", f"mix-{i}")
+        print(f"Running {mix['name']}...")
+        reports.append(await run_mix(mix, corpus, args.base_url, args.seed + i))
+
+    result = {"base_url": args.base_url, "created_at": time.time(), "mixes": reports}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(reports, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nReport written to {args.out}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay request mixes against /rank-resumes")
+    parser.add_argument("mixes", help="JSONL file with one request mix per line")
+    parser.add_argument("--corpus", default="resumes", help="folder with sample .pdf/.docx/.jpg/.png files")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -11,8 +11,13 @@ from typing import List
 
 app = FastAPI(title="AI Resume Parser API")
 
+# Skill matching only needs the tokenizer + EntityRuler, so the trained
+# components of en_core_web_sm are never loaded
+UNUSED_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+PIPE_BATCH_SIZE = 32
+
 # Load base spaCy model once on startup
-base_nlp = spacy.load("en_core_web_sm")
+base_nlp = spacy.load("en_core_web_sm", exclude=UNUSED_COMPONENTS)
 
 # ------------------ HELPERS ------------------
 
@@ -60,19 +65,20 @@ async def rank_resumes(
 
     # Create a local copy of the model for this request's specific keywords
     # Using a fresh EntityRuler for each request to keep it dynamic
-    nlp = spacy.load("en_core_web_sm")
-    ruler = nlp.add_pipe("entity_ruler", before="ner")
+    nlp = spacy.load("en_core_web_sm", exclude=UNUSED_COMPONENTS)
+    ruler = nlp.add_pipe("entity_ruler")
     
     patterns = [{"label": "SKILL", "pattern": [{"LOWER": s}]} for s in target_skills]
     ruler.add_patterns(patterns)
 
-    # 2. Process each file
-    results = []
+    # 2. Extract every file, then match all texts in one batched pass
+    texts = []
     for file in files:
         content = await file.read()
-        raw_text = extract_text_from_bytes(content, file.filename)
-        
-        doc = nlp(raw_text)
+        texts.append(extract_text_from_bytes(content, file.filename))
+
+    results = []
+    for file, doc in zip(files, nlp.pipe(texts, batch_size=PIPE_BATCH_SIZE)):
         found_matches = list(set([ent.text.lower() for ent in doc.ents if ent.label_ == "SKILL"]))
         
         results.append({
@@ -0,0 +1,139 @@
+import io
+import tempfile
+import importlib.util
+import subprocess
+import pytesseract
+from PIL import Image, ImageOps
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+# tesserocr talks to libtesseract directly; without it the image is piped
+# to the tesseract CLI over stdin. Neither path writes temporary files.
+# tesserocr is only imported on first use inside a worker: OpenMP reads
+# OMP_THREAD_LIMIT once when libtesseract loads, so loading it here, in the
+# parent before the pool forks, would ignore the worker's thread limit.
+HAS_TESSEROCR = importlib.util.find_spec("tesserocr") is not None
+
+# ------------------ CONFIG ------------------
+OCR_PAGE_DPI = 180          # resolution uploads are normalized to; plenty for 10pt+ resume text
+PAGE_SHORT_SIDE_IN = 8.27   # page width (A4, the narrower of A4/Letter); longer images are multi-page or screenshots
+OCR_CROP_PADDING = 20       # px of margin kept around the detected content
+OCR_MARGIN_TOLERANCE = 30   # gray levels a pixel may differ from the margin colour and still be margin
+OCR_BINARIZE = True
+
+_tesserocr_api = None
+
+# ------------------ PREPROCESSING ------------------
+
+def otsu_threshold(gray):
+    """Threshold that best separates ink from paper in a grayscale histogram."""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_sum = sum(i * count for i, count in enumerate(histogram))
+    background_sum, background_count = 0, 0
+    best_threshold, best_variance = 127, 0.0
+    for i, count in enumerate(histogram):
+        background_count += count
+        if background_count == 0:
+            continue
+        foreground_count = total - background_count
+        if foreground_count == 0:
+            break
+        background_sum += i * count
+        background_mean = background_sum / background_count
+        foreground_mean = (weighted_sum - background_sum) / foreground_count
+        variance = background_count * foreground_count * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+def page_target_size(size):
+    """
+    Same aspect ratio as `size`, with the short side at OCR_PAGE_DPI across one
+    page width. Scaling by the short side keeps tall multi-page exports and long
+    screenshots as legible as a single page. Images already that small are kept.
+    """
+    scale = OCR_PAGE_DPI * PAGE_SHORT_SIDE_IN / min(size)
+    if scale >= 1:
+        return size
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+def preprocess_image(image):
+    """
+    Prepares an uploaded photo/scan for OCR:
+    upright, grayscale, one page at OCR_PAGE_DPI, binarized, margins cropped.
+    """
+    target = page_target_size(image.size)
+    if target != image.size:
+        # JPEG decodes straight at 1/2, 1/4 or 1/8 scale (DCT scaling) when that
+        # still covers the target: a 4032x3024 photo is decoded as 2016x1512
+        image.draft("L", target)
+    image = ImageOps.exif_transpose(image)
+    gray = image.convert("L")
+    target = page_target_size(gray.size)
+    if target != gray.size:
+        gray = gray.resize(target, Image.LANCZOS)
+
+    # Margins are whatever still looks like the corner pixel (paper edge or table)
+    background = gray.getpixel((0, 0))
+    content = gray.point(lambda p: 255 if abs(p - background) > OCR_MARGIN_TOLERANCE else 0)
+    bbox = content.getbbox()
+    if bbox:
+        left, top, right, bottom = bbox
+        gray = gray.crop((
+            max(0, left - OCR_CROP_PADDING),
+            max(0, top - OCR_CROP_PADDING),
+            min(gray.width, right + OCR_CROP_PADDING),
+            min(gray.height, bottom + OCR_CROP_PADDING),
+        ))
+
+    if OCR_BINARIZE:
+        threshold = otsu_threshold(gray)
+        gray = gray.point(lambda p: 255 if p > threshold else 0)
+    return gray
+
+# ------------------ OCR ENGINE ------------------
+
+def ocr_image(image):
+    """Runs tesseract on a PIL image held in memory."""
+    global _tesserocr_api
+    if HAS_TESSEROCR:
+        if _tesserocr_api is None:
+            import tesserocr
+            _tesserocr_api = tesserocr.PyTessBaseAPI()
+        _tesserocr_api.SetImage(image)
+        return _tesserocr_api.GetUTF8Text()
+
+    # PNM needs no compression, so encoding costs next to nothing
+    if image.mode not in ("1", "L", "RGB"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PPM")
+    completed = subprocess.run(
+        [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout"],
+        input=buffer.getvalue(),
+        capture_output=True,
+        check=True
+    )
+    return completed.stdout.decode("utf-8", errors="replace")
+
+def ocr_image_bytes(file_bytes):
+    """OCR for JPG/PNG uploads: preprocess, then recognise without temp files."""
+    return ocr_image(preprocess_image(Image.open(io.BytesIO(file_bytes))))
+
+def ocr_pdf_bytes(file_bytes):
+    """
+    OCR for scanned PDFs, one page at a time: only a single rasterized page
+    is alive at once, so peak memory doesn't grow with the page count.
+    poppler needs a file, so the PDF is spooled once and every page reads it
+    (the *_from_bytes helpers would write a fresh temp copy per call).
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf:
+        pdf.write(file_bytes)
+        pdf.flush()
+        page_count = pdfinfo_from_path(pdf.name)["Pages"]
+        texts = []
+        for page_number in range(1, page_count + 1):
+            page = convert_from_path(pdf.name, first_page=page_number, last_page=page_number)[0]
+            texts.append(ocr_image(page))
+            page.close()
+    return "\n".join(texts)
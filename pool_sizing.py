@@ -0,0 +1,283 @@
+"""
+Worker pool sizing that respects container CPU quotas and tesseract threading.
+
+`os.cpu_count()` reports the host's cores, not the pod's cgroup quota, and every
+tesseract call can spin up its own OpenMP threads on top of our worker processes.
+AdaptiveProcessPool caps workers at (quota CPUs / OCR threads per call) and then
+grows or shrinks between its bounds from queue depth and measured CPU usage.
+"""
+import os
+import math
+import time
+import functools
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ------------------ CONFIG ------------------
+OCR_THREADS = int(os.environ.get("OMP_THREAD_LIMIT", "1"))   # threads per tesseract call
+POOL_MIN_WORKERS = int(os.environ.get("POOL_MIN_WORKERS", "1"))
+POOL_MAX_WORKERS = os.environ.get("POOL_MAX_WORKERS")        # default: derived from the CPU quota
+RESIZE_COOLDOWN_SEC = 10    # minimum time between two resizes
+HIGH_CPU = 0.90             # above this the CPU is saturated, never grow
+CPU_HEADROOM = 1.0          # CPUs the API process itself may use before a saturated pool counts as oversubscribed
+MAX_WORKER_RSS_MB = int(os.environ.get("MAX_WORKER_RSS_MB", "1024"))  # recycle workers above this, 0 = off
+
+# ------------------ CPU DISCOVERY ------------------
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def cgroup_cpu_limit():
+    """CPU quota of this container in (possibly fractional) CPUs, or None if unlimited."""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    # cgroup v1
+    quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+def effective_cpu_count():
+    """CPUs this process may actually use: affinity mask capped by the cgroup quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+def pool_bounds():
+    """(min, max) worker processes so that workers x OCR threads fits the CPU quota."""
+    max_workers = int(POOL_MAX_WORKERS) if POOL_MAX_WORKERS else effective_cpu_count() // max(1, OCR_THREADS)
+    max_workers = max(1, max_workers)
+    return min(POOL_MIN_WORKERS, max_workers), max_workers
+
+class CpuMeter:
+    """Fraction of the available CPU used since the previous reading."""
+
+    def __init__(self):
+        self.cpus = effective_cpu_count()
+        self.last = self._sample()
+
+    def _sample(self):
+        # Prefer the cgroup's own accounting so neighbours on the host don't count
+        stat = _read("/sys/fs/cgroup/cpu.stat")
+        if stat:
+            for line in stat.splitlines():
+                key, _, value = line.partition(" ")
+                if key == "usage_usec":
+                    return ("cgroup", time.monotonic(), int(value) / 1e6)
+        proc = _read("/proc/stat")
+        if proc:
+            fields = [int(v) for v in proc.splitlines()[0].split()[1:]]
+            idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+            return ("proc", sum(fields), sum(fields) - idle)
+        return None
+
+    def utilization(self):
+        current = self._sample()
+        previous, self.last = self.last, current
+        if current is None or previous is None or current[0] != previous[0]:
+            return None
+        if current[0] == "cgroup":
+            elapsed = current[1] - previous[1]
+            if elapsed <= 0:
+                return None
+            return (current[2] - previous[2]) / (elapsed * self.cpus)
+        total = current[1] - previous[1]
+        if total <= 0:
+            return None
+        return (current[2] - previous[2]) / total
+
+# ------------------ ADAPTIVE POOL ------------------
+
+def current_rss():
+    """Resident memory of this process in bytes, or None if it can't be measured."""
+    statm = _read("/proc/self/statm")
+    if statm:
+        return int(statm.split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    if resource is None:
+        return None
+    # Peak rather than current, but still catches a worker that ballooned
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def measured_call(fn, args, kwargs):
+    """Runs in the worker; reports the worker's RSS alongside the result."""
+    result = fn(*args, **kwargs)
+    return result, current_rss()
+
+def limit_ocr_threads(ocr_threads):
+    # Inherited by every tesseract subprocess this worker spawns
+    os.environ["OMP_THREAD_LIMIT"] = str(ocr_threads)
+
+class AdaptiveProcessPool(Executor):
+    """
+    Process pool whose size follows the load.
+    Submitted tasks wait in this wrapper's own backlog and at most `size` of
+    them run at once, each in a single-process ProcessPoolExecutor. Resizing
+    therefore only changes how many workers the backlog feeds: growing starts
+    more of them for the work already queued, shrinking retires workers as
+    they go idle, and live workers never exceed `max_workers`.
+    A worker that reports more than MAX_WORKER_RSS_MB after a task is retired
+    and replaced, so a leaky or huge document can't pin memory forever.
+    """
+
+    def __init__(self, min_workers=None, max_workers=None, ocr_threads=OCR_THREADS):
+        default_min, default_max = pool_bounds()
+        self.max_workers = max_workers or default_max
+        self.min_workers = min(min_workers or default_min, self.max_workers)
+        self.ocr_threads = ocr_threads
+        self.size = max(self.min_workers, self.max_workers // 2)
+        self.backlog = deque()   # (future, fn, args, kwargs) not handed to a worker yet
+        self.idle = []           # single-process pools waiting for work
+        self.running = 0
+        self.closed = False
+        self.lock = threading.RLock()
+        self.drained = threading.Condition(self.lock)
+        self.cpu = CpuMeter()
+        self.last_cpu = None
+        self.last_resize = time.monotonic()
+        self.recycles = 0
+
+    @property
+    def pending(self):
+        return len(self.backlog) + self.running
+
+    def _new_worker(self):
+        return ProcessPoolExecutor(
+            max_workers=1,
+            initializer=limit_ocr_threads,
+            initargs=(self.ocr_threads,)
+        )
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self.backlog.append((future, fn, args, kwargs))
+            self._maybe_resize()
+            self._dispatch()
+        return future
+
+    def _dispatch(self):
+        """Hands queued tasks to workers until `size` of them are running. Lock held."""
+        while self.backlog and self.running < self.size:
+            future, fn, args, kwargs = self.backlog.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue  # cancelled while queued, e.g. the client went away
+            worker = self.idle.pop() if self.idle else self._new_worker()
+            try:
+                inner = worker.submit(measured_call, fn, args, kwargs)
+            except BrokenProcessPool as e:
+                worker.shutdown(wait=False)
+                future.set_exception(e)
+                continue
+            self.running += 1
+            inner.add_done_callback(functools.partial(self._task_done, worker, future))
+
+    def _task_done(self, worker, future, inner):
+        rss = None
+        error = None if inner.cancelled() else inner.exception()
+        if inner.cancelled():
+            future.set_exception(CancelledError())
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            result, rss = inner.result()
+            future.set_result(result)
+
+        with self.lock:
+            self.running -= 1
+            over_limit = bool(MAX_WORKER_RSS_MB and rss and rss > MAX_WORKER_RSS_MB * 1024 * 1024)
+            if over_limit:
+                self.recycles += 1
+            # Retire the process itself when it is bloated, dead, or one too many after a shrink
+            if over_limit or isinstance(error, BrokenProcessPool) or self.closed \
+                    or len(self.idle) + self.running >= self.size:
+                worker.shutdown(wait=False)
+            else:
+                self.idle.append(worker)
+            self._maybe_resize()
+            self._dispatch()
+            self.drained.notify_all()
+
+    def _target_size(self):
+        cpu = self.cpu.utilization()
+        self.last_cpu = cpu
+        if cpu is not None and cpu > HIGH_CPU:
+            # Saturated. If our own workers account for the load, adding more would
+            # only fight over the same cores, so hold. Shrink only when more CPUs
+            # are busy than the workers and the API process can explain
+            # (tesseract threads beyond OCR_THREADS, noisy neighbours in the pod).
+            explained = self.size * self.ocr_threads + CPU_HEADROOM
+            if cpu * self.cpu.cpus > explained and self.pending > 0:
+                return self.size - 1
+            return self.size
+        if self.pending > self.size:
+            return min(self.pending, self.size * 2)
+        if self.pending < self.size // 2:
+            return max(self.pending, self.size // 2)
+        return self.size
+
+    def _maybe_resize(self):
+        if time.monotonic() - self.last_resize < RESIZE_COOLDOWN_SEC:
+            return
+        self.last_resize = time.monotonic()
+        target = max(self.min_workers, min(self.max_workers, self._target_size()))
+        if target != self.size:
+            self.resize(target)
+
+    def resize(self, size):
+        with self.lock:
+            self.size = size
+            # Busy workers beyond the new size are retired when their task ends
+            while self.idle and len(self.idle) + self.running > size:
+                self.idle.pop().shutdown(wait=False)
+            self._dispatch()
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self.lock:
+            self.closed = True
+            if cancel_futures:
+                while self.backlog:
+                    self.backlog.popleft()[0].cancel()
+            if wait:
+                self.drained.wait_for(lambda: not self.backlog and self.running == 0)
+            workers, self.idle = self.idle, []
+        for worker in workers:
+            worker.shutdown(wait=wait)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.size,
+                "live_workers": len(self.idle) + self.running,
+                "min_workers": self.min_workers,
+                "max_workers": self.max_workers,
+                "pending_tasks": self.pending,
+                "running_tasks": self.running,
+                "ocr_threads": self.ocr_threads,
+                "max_worker_rss_mb": MAX_WORKER_RSS_MB,
+                "recycles": self.recycles,
+                "cpu_utilization": None if self.last_cpu is None else round(self.last_cpu, 3),
+            }
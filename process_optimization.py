@@ -6,10 +6,11 @@ import docx
 import pytesseract
 import asyncio
 from concurrent.futures import ProcessPoolExecutor
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Response
 from pdf2image import convert_from_bytes
 from PIL import Image
 from typing import List
+from result_formats import encode_batch, negotiate, BATCH_FORMATS, JSON
 
 app = FastAPI(title="High-Performance AI Resume Parser")
 
@@ -63,6 +64,7 @@ def process_single_resume(file_bytes, filename, target_skills):
 
 @app.post("/rank-resumes")
 async def rank_resumes(
+    request: Request,
     skills: str = Form(...), 
     files: List[UploadFile] = File(...)
 ):
@@ -92,7 +94,7 @@ async def rank_resumes(
     results.sort(key=lambda x: x.get('score', 0), reverse=True)
     total_time = round(time.time() - overall_start_time, 3)
     
-    return {
+    payload = {
         "requested_skills": target_skills,
         "total_files_processed": len(files),
         "total_processing_time_sec": total_time,
@@ -100,6 +102,12 @@ async def rank_resumes(
         "rankings": results
     }
 
+    # Compact columnar / MessagePack encodings are opt-in via the Accept header
+    media_type = negotiate(request.headers.get("accept"), BATCH_FORMATS)
+    if media_type == JSON:
+        return payload
+    return Response(content=encode_batch(payload, media_type), media_type=media_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,162 @@
+import json
+import msgpack
+
+# ------------------ MEDIA TYPES ------------------
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+COLUMNAR_JSON = "application/vnd.resumefilter.columnar+json"
+COLUMNAR_NDJSON = "application/vnd.resumefilter.columnar+x-ndjson"
+MSGPACK = "application/x-msgpack"
+
+# Streaming endpoints emit one record per file, batch endpoints one document.
+STREAM_FORMATS = [NDJSON, COLUMNAR_NDJSON, MSGPACK]
+BATCH_FORMATS = [JSON, COLUMNAR_JSON, MSGPACK]
+
+# Every compact row has exactly these columns, in this order.
+# matched_skills holds integer ids into the "skills" dictionary sent once up front,
+# and "extra" carries any other result keys (profile_id, ...) or null.
+ROW_COLUMNS = ["filename", "status", "score", "matched_skills", "time_taken_sec", "error", "extra"]
+_KNOWN_KEYS = set(ROW_COLUMNS) - {"extra"}
+
+# ------------------ NEGOTIATION ------------------
+
+def negotiate(accept, offered):
+    """Picks the best media type from an Accept header, defaulting to offered[0]."""
+    candidates = []
+    for position, part in enumerate((accept or "").split(",")):
+        media, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if quality > 0:
+            candidates.append((-quality, position, media.strip().lower()))
+
+    for _, _, media in sorted(candidates):
+        if media in offered:
+            return media
+        if media in ("*/*", "application/*"):
+            return offered[0]
+    return offered[0]
+
+# ------------------ ENCODING ------------------
+
+def skill_dictionary(target_skills):
+    return {skill: i for i, skill in enumerate(target_skills)}
+
+def to_row(result, skill_ids):
+    # Skills missing from the dictionary are kept as plain strings
+    skills = [skill_ids.get(s, s) for s in result.get("matched_skills", [])]
+    extra = {k: v for k, v in result.items() if k not in _KNOWN_KEYS}
+    return [
+        result.get("filename"),
+        result.get("status"),
+        result.get("score", 0),
+        skills,
+        result.get("time_taken_sec"),
+        result.get("error"),
+        extra or None,
+    ]
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"))
+
+class StreamEncoder:
+    """Turns per-file results into chunks for a StreamingResponse."""
+
+    def __init__(self, media_type, target_skills):
+        self.media_type = media_type
+        self.target_skills = target_skills
+        self.skill_ids = skill_dictionary(target_skills)
+
+    def header(self):
+        if self.media_type == NDJSON:
+            return None
+        header = {"columns": ROW_COLUMNS, "skills": self.target_skills}
+        if self.media_type == MSGPACK:
+            return msgpack.packb(header)
+        return _dumps(header) + "\n"
+
+    def encode(self, result):
+        if self.media_type == NDJSON:
+            return json.dumps(result) + "\n"
+        row = to_row(result, self.skill_ids)
+        if self.media_type == MSGPACK:
+            return msgpack.packb(row)
+        return _dumps(row) + "\n"
+
+def encode_batch(payload, media_type):
+    """
+    Encodes a batch response ({..., "requested_skills", "rankings"}) as bytes.
+    The rankings list of dicts becomes column names + dictionary-encoded rows.
+    """
+    if media_type == JSON:
+        return json.dumps(payload).encode()
+    skill_ids = skill_dictionary(payload["requested_skills"])
+    body = {k: v for k, v in payload.items() if k not in ("requested_skills", "rankings")}
+    body["columns"] = ROW_COLUMNS
+    body["skills"] = payload["requested_skills"]
+    body["rows"] = [to_row(r, skill_ids) for r in payload["rankings"]]
+    if media_type == MSGPACK:
+        return msgpack.packb(body)
+    return _dumps(body).encode()
+
+# ------------------ DECODING (client side) ------------------
+
+def from_row(row, skills):
+    result = dict(zip(ROW_COLUMNS, row))
+    extra = result.pop("extra") or {}
+    result["matched_skills"] = [skills[s] if isinstance(s, int) else s for s in result["matched_skills"]]
+    result.update(extra)
+    return {k: v for k, v in result.items() if v is not None}
+
+class StreamDecoder:
+    """Incremental decoding: feed() raw chunks as they arrive, get back the finished result dicts."""
+
+    def __init__(self, media_type):
+        self.media_type = media_type
+        self.skills = None
+        self.buffer = b""
+        self.unpacker = msgpack.Unpacker(raw=False) if media_type == MSGPACK else None
+
+    def feed(self, chunk):
+        if self.unpacker is not None:
+            self.unpacker.feed(chunk)
+            objects = list(self.unpacker)
+        else:
+            self.buffer += chunk
+            *lines, self.buffer = self.buffer.split(b"\n")
+            objects = [json.loads(line) for line in lines if line.strip()]
+
+        results = []
+        for obj in objects:
+            if self.media_type == NDJSON:
+                results.append(obj)
+            elif self.skills is None:
+                self.skills = obj["skills"]
+            else:
+                results.append(from_row(obj, self.skills))
+        return results
+
+def decode_stream(chunks, media_type):
+    """Yields result dicts from an iterable of raw response chunks (bytes)."""
+    decoder = StreamDecoder(media_type)
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+
+def decode_batch(body, media_type):
+    """Inverse of encode_batch: returns the plain JSON-shaped payload."""
+    if media_type == JSON:
+        return json.loads(body)
+    data = msgpack.unpackb(body, raw=False) if media_type == MSGPACK else json.loads(body)
+    skills = data.pop("skills")
+    data.pop("columns")
+    rows = data.pop("rows")
+    data["requested_skills"] = skills
+    data["rankings"] = [from_row(r, skills) for r in rows]
+    return data
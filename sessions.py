@@ -0,0 +1,83 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+# ------------------ CONFIG ------------------
+SESSION_TTL_SEC = 60 * 60   # sessions expire an hour after their last use
+MAX_SESSIONS = 100          # oldest sessions are evicted first
+
+# ------------------ SESSIONS ------------------
+
+class RankingSession:
+    """
+    Token sets of every resume from one /rank-resumes request.
+    Skills are single-token LOWER patterns, so a skill matches a resume exactly
+    when it is in that resume's lowercased token set; no re-extraction needed.
+    """
+
+    def __init__(self, target_skills):
+        self.session_id = uuid.uuid4().hex
+        self.target_skills = list(target_skills)
+        self.entries = []   # (result, frozenset of tokens or None for failed files)
+        self.complete = False
+        self.aborted = False
+        self.last_used = time.time()
+
+    def add(self, result, tokens):
+        self.entries.append((result, frozenset(tokens) if tokens is not None else None))
+
+    def abort(self):
+        """The stream stopped early (e.g. client disconnect); the results are incomplete."""
+        self.aborted = True
+        self.entries = []
+
+    def rerank(self, add_skills, remove_skills):
+        """Applies a skills delta and returns the re-ranked results."""
+        removed = set(remove_skills)
+        added = [s for s in add_skills if s not in removed and s not in self.target_skills]
+        self.target_skills = [s for s in self.target_skills if s not in removed] + added
+
+        rankings = []
+        for index, (result, tokens) in enumerate(self.entries):
+            if tokens is None:
+                rankings.append(result)
+                continue
+            matched = set(result["matched_skills"]) - removed
+            matched.update(s for s in added if s in tokens)
+            result = {**result, "score": len(matched), "matched_skills": sorted(matched)}
+            self.entries[index] = (result, tokens)
+            rankings.append(result)
+
+        rankings.sort(key=lambda x: x.get("score", 0), reverse=True)
+        return rankings
+
+class SessionStore:
+    def __init__(self, ttl=SESSION_TTL_SEC, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def create(self, target_skills):
+        session = RankingSession(target_skills)
+        with self.lock:
+            self._evict()
+            self.sessions[session.session_id] = session
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id):
+        with self.lock:
+            self._evict()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.time()
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl
+        for session_id in [k for k, v in self.sessions.items() if v.last_used < cutoff]:
+            del self.sessions[session_id]
@@ -0,0 +1,176 @@
+"""
+Positional token index per resume, for phrase and proximity queries.
+
+Each processed resume can be written to INDEX_DIR/<sha256>.idx as:
+    magic "RSIX" | u32 metadata length | metadata JSON
+    u32 term count | u64 term ids (sorted) | u32 offsets (count + 1) | u32 positions
+Term ids are spaCy's 64-bit LOWER string hashes, so no shared vocabulary
+file is needed. Positions count words only; punctuation and whitespace
+tokens are skipped, so "within 5 words" means 5 words.
+"""
+import os
+import re
+import json
+import array
+import bisect
+import struct
+import functools
+import spacy
+from spacy.attrs import LOWER, IS_PUNCT, IS_SPACE
+from spacy.strings import get_string_id
+
+# ------------------ CONFIG ------------------
+INDEX_DIR = os.environ.get("INDEX_DIR", "index")
+INDEX_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+MAGIC = b"RSIX"
+
+# ------------------ BUILDING ------------------
+
+def term_positions(doc):
+    """Maps LOWER term id -> ascending word positions for one spaCy doc."""
+    positions = {}
+    word = 0
+    for term_id, is_punct, is_space in doc.to_array([LOWER, IS_PUNCT, IS_SPACE]).tolist():
+        if is_punct or is_space:
+            continue
+        positions.setdefault(term_id, []).append(word)
+        word += 1
+    return positions, word
+
+def write_index(doc, index_id, metadata, index_dir=INDEX_DIR):
+    positions, word_count = term_positions(doc)
+    term_ids = sorted(positions)
+    offsets = array.array("I", [0])
+    flat = array.array("I")
+    for term_id in term_ids:
+        flat.extend(positions[term_id])
+        offsets.append(len(flat))
+
+    meta = json.dumps({**metadata, "index_id": index_id, "word_count": word_count}).encode()
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, index_id + ".idx")
+    # Write then rename so readers never see a half-written index
+    with open(path + ".tmp", "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(meta)) + meta)
+        f.write(struct.pack("<I", len(term_ids)))
+        f.write(array.array("Q", term_ids).tobytes())
+        f.write(offsets.tobytes())
+        f.write(flat.tobytes())
+    os.replace(path + ".tmp", path)
+    return index_id
+
+# ------------------ READING ------------------
+
+class ResumeIndex:
+    def __init__(self, data):
+        if data[:4] != MAGIC:
+            raise ValueError("Not a resume index file")
+        (meta_len,) = struct.unpack_from("<I", data, 4)
+        self.metadata = json.loads(data[8:8 + meta_len])
+        pos = 8 + meta_len
+        (count,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        self.term_ids = array.array("Q", data[pos:pos + 8 * count])
+        pos += 8 * count
+        self.offsets = array.array("I", data[pos:pos + 4 * (count + 1)])
+        pos += 4 * (count + 1)
+        self.positions_flat = array.array("I", data[pos:])
+
+    def positions(self, term_id):
+        i = bisect.bisect_left(self.term_ids, term_id)
+        if i == len(self.term_ids) or self.term_ids[i] != term_id:
+            return []
+        return self.positions_flat[self.offsets[i]:self.offsets[i + 1]]
+
+@functools.lru_cache(maxsize=4096)
+def _load(path, mtime):
+    with open(path, "rb") as f:
+        return ResumeIndex(f.read())
+
+def load_index(index_id, index_dir=INDEX_DIR):
+    path = os.path.join(index_dir, index_id + ".idx")
+    return _load(path, os.path.getmtime(path))
+
+def list_index_ids(index_dir=INDEX_DIR):
+    if not os.path.isdir(index_dir):
+        return []
+    return sorted(name[:-4] for name in os.listdir(index_dir) if name.endswith(".idx"))
+
+# ------------------ QUERIES ------------------
+
+@functools.lru_cache(maxsize=1)
+def _tokenizer():
+    return spacy.blank("en").tokenizer
+
+def query_terms(text):
+    """Tokenizes query text exactly like the indexed resumes."""
+    return [get_string_id(t.lower_) for t in _tokenizer()(text) if not (t.is_punct or t.is_space)]
+
+def phrase_hits(index, term_ids):
+    """Word positions where the terms appear consecutively."""
+    if not term_ids:
+        return []
+    starts = set(index.positions(term_ids[0]))
+    for offset, term_id in enumerate(term_ids[1:], start=1):
+        starts &= {p - offset for p in index.positions(term_id)}
+        if not starts:
+            break
+    return sorted(starts)
+
+def near_hits(index, left, right, distance):
+    """Pairs of positions where the two phrases are at most `distance` words apart."""
+    left_hits = phrase_hits(index, left)
+    right_hits = phrase_hits(index, right)
+    hits = []
+    j = 0
+    for p in left_hits:
+        while j < len(right_hits) and right_hits[j] < p - distance:
+            j += 1
+        k = j
+        while k < len(right_hits) and right_hits[k] <= p + distance:
+            if right_hits[k] != p:
+                hits.append((p, right_hits[k]))
+            k += 1
+    return hits
+
+CLAUSE_PATTERN = re.compile(
+    r'\s*(?:(?P<left>"[^"]+"|\S+)\s+NEAR/(?P<distance>\d+)\s+(?P<right>"[^"]+"|\S+)|(?P<term>"[^"]+"|\S+))'
+)
+
+def parse_query(query):
+    """
+    Splits a query into clauses that must all match:
+        "senior engineer"        phrase
+        python NEAR/5 django     proximity (either order), phrases allowed on both sides
+        kubernetes               single term
+    """
+    clauses = []
+    for match in CLAUSE_PATTERN.finditer(query):
+        if match.group("term"):
+            text = match.group("term").strip('"')
+            clauses.append({"type": "phrase", "text": text, "terms": query_terms(text)})
+        else:
+            left = match.group("left").strip('"')
+            right = match.group("right").strip('"')
+            clauses.append({
+                "type": "near",
+                "text": f"{left} NEAR/{match.group('distance')} {right}",
+                "left": query_terms(left),
+                "right": query_terms(right),
+                "distance": int(match.group("distance")),
+            })
+    # Clauses made only of punctuation have nothing to look up
+    return [c for c in clauses if all(c.get(key, True) for key in ("terms", "left", "right"))]
+
+def run_query(clauses, index):
+    """Hit count per clause, or None if any clause has no hits."""
+    hits = {}
+    for clause in clauses:
+        if clause["type"] == "phrase":
+            count = len(phrase_hits(index, clause["terms"]))
+        else:
+            count = len(near_hits(index, clause["left"], clause["right"], clause["distance"]))
+        if count == 0:
+            return None
+        hits[clause["text"]] = count
+    return hits